@@ -1,6 +1,26 @@
 from typing import Any, Union
-import random
 import math
+import operator
+import numpy as np
+
+# -- When False, operations only compute their output and do not record children
+#    or a backward_func, so no computational graph is built. Toggled by no_grad
+_GRAD_ENABLED = True
+
+
+class no_grad(object):
+    '''
+    Context manager for inference: inside a "with no_grad():" block no computational graph is built
+    '''
+    def __enter__(self):
+        global _GRAD_ENABLED
+        self.prev = _GRAD_ENABLED
+        _GRAD_ENABLED = False
+        return self
+
+    def __exit__(self, *args):
+        global _GRAD_ENABLED
+        _GRAD_ENABLED = self.prev
 
 # -- Value object
 # -- Should handle operations with the following data types:
@@ -15,24 +35,29 @@ class Value(object):
         output:
             - Value object with value = x
     '''
-    def __init__(self, x:Union[float, int, str], children=[], requires_grad=False):
-        self.children = children
-        self.backward_func = None
-        self.grad = 0.0
-        self.requires_grad = requires_grad
-        self.valid_dtypes = [float, int, Value, str]
-        assert type(x) in self.valid_dtypes, "Invalid input dtype {}. Should be in: {}".format(type(x), [repr(dtype) for dtype in self.valid_dtypes])
-        if type(x) in [int, str]:
-            try:
-                x = float(x)
-            except:
-                raise Exception("str object cannot be converted to either float or int")
+    __slots__ = ('children', 'backward_func', 'grad', 'requires_grad', 'val')
+
+    def __init__(self, x:Union[float, int, str], children=None, requires_grad=False):
+        # -- float is by far the most common input, so it is checked first
+        tx = type(x)
+        if tx is float:
             self.val = x
-        elif type(x) == Value:
+        elif tx is int:
+            self.val = float(x)
+        elif tx is Value:
             self.val = x.val
-            del x
+        elif tx is str:
+            self.val = float(x)
         else:
-            self.val = x
+            # -- Subclasses of float/int (e.g. np.float64) share the conversion of the Tensor operators
+            val = _to_scalar(x)
+            if val is None:
+                raise TypeError("Invalid input dtype {}. Should be one of float, int, Value, str".format(tx))
+            self.val = val
+        self.children = children if children is not None else ()
+        self.backward_func = None
+        self.grad = 0.0
+        self.requires_grad = requires_grad
 
     def value(self):
         return self.val
@@ -45,18 +70,32 @@ class Value(object):
     
     def __neg__(self):
         # Return a new Value instance with the negated value
-        return Value(-self.val, [self])
-    
+        value = Value(-self.val)
+        if _GRAD_ENABLED:
+            value.children = (self,)
+            value.backward_func = (_neg_bwd, None)
+        return value
+
+    # -- Binary operators check type(other) against Value first, then against the
+    #    python scalars. A scalar operand is not a node of the graph, so it is not
+    #    added to the children and receives no gradient. For any other type
+    #    NotImplemented is returned, so that python can try the reflected operator
     def __add__(self, other):
-        if isinstance(other, type(self)):
-            value = Value(self.val + other.val, [self, other])
-        else:
-            try: 
-                value = Value(self.val + other, [self, other])
-            except:
-                raise Exception("{} is an invalid dtype for addition with {}".format(type(other), type(self)))
-        
-        value.backward_func = backward_add()
+        t = type(other)
+        if t is Value:
+            value = Value(self.val + other.val)
+            if _GRAD_ENABLED:
+                value.children = (self, other)
+                value.backward_func = (_add_bwd, None)
+            return value
+        if t is not float and t is not int:
+            other = _to_scalar(other)
+            if other is None:
+                return NotImplemented
+        value = Value(self.val + other)
+        if _GRAD_ENABLED:
+            value.children = (self,)
+            value.backward_func = (_add_scalar_bwd, None)
         return value
 
     def __radd__(self, other):
@@ -64,138 +103,400 @@ class Value(object):
         return self.__add__(other)
 
     def __sub__(self, other):
-        if isinstance(other, type(self)):
-            value = Value(self.val - other.val, [self, other])
-        else:
-            try: 
-                value = Value(self.val - other, [self, other])
-            except:
-                raise Exception("{} is an invalid dtype for addition with {}".format(type(other), type(self)))
-        
-        value.backward_func = backward_sub()
+        t = type(other)
+        if t is Value:
+            value = Value(self.val - other.val)
+            if _GRAD_ENABLED:
+                value.children = (self, other)
+                value.backward_func = (_sub_bwd, None)
+            return value
+        if t is not float and t is not int:
+            other = _to_scalar(other)
+            if other is None:
+                return NotImplemented
+        value = Value(self.val - other)
+        if _GRAD_ENABLED:
+            value.children = (self,)
+            value.backward_func = (_add_scalar_bwd, None)
         return value
 
     def __rsub__(self, other):
-    # Call __add__ to handle the reverse addition
-        return self.__sub__(other)
+        # other - self, where other is a python scalar
+        t = type(other)
+        if t is not float and t is not int:
+            other = _to_scalar(other)
+            if other is None:
+                return NotImplemented
+        value = Value(other - self.val)
+        if _GRAD_ENABLED:
+            value.children = (self,)
+            value.backward_func = (_neg_bwd, None)
+        return value
                             
     def __mul__(self, other):
-        if isinstance(other, type(self)):
-            value = Value(self.val * other.val, [self, other])
-            value.backward_func = backward_mul(cache=[self.val, other.val])
-        else:
-            try: 
-                value = Value(self.val * other, [self, other])
-                value.backward_func = backward_mul(cache=[self.val, other])
-            except:
-                raise Exception("{} is an invalid dtype for addition with {}".format(type(other), type(self)))
+        t = type(other)
+        if t is Value:
+            value = Value(self.val * other.val)
+            if _GRAD_ENABLED:
+                value.children = (self, other)
+                value.backward_func = (_mul_bwd, (self.val, other.val))
+            return value
+        if t is not float and t is not int:
+            other = _to_scalar(other)
+            if other is None:
+                return NotImplemented
+        value = Value(self.val * other)
+        if _GRAD_ENABLED:
+            value.children = (self,)
+            value.backward_func = (_mul_scalar_bwd, other)
         return value
     
     def __rmul__(self, other):
-    # Call __add__ to handle the reverse addition
+    # Call __mul__ to handle the reverse multiplication
         return self.__mul__(other)
     
     def __truediv__(self, other):
-        if isinstance(other, type(self)):
-            value = Value(self.val / other.val, [self, other])
-            value.backward_func = backward_div(cache=[self.val, other.val])
-        else:
-            try: 
-                value = Value(self.val / other, [self, other])
-                value.backward_func = backward_div(cache=[self.val, other])
-            except:
-                raise Exception("{} is an invalid dtype for addition with {}".format(type(other), type(self)))
+        t = type(other)
+        if t is Value:
+            value = Value(self.val / other.val)
+            if _GRAD_ENABLED:
+                value.children = (self, other)
+                value.backward_func = (_div_bwd, (self.val, other.val))
+            return value
+        if t is not float and t is not int:
+            other = _to_scalar(other)
+            if other is None:
+                return NotImplemented
+        value = Value(self.val / other)
+        if _GRAD_ENABLED:
+            value.children = (self,)
+            value.backward_func = (_div_scalar_bwd, other)
         return value
 
     def __rtruediv__(self, other):
-    # Call __add__ to handle the reverse addition
-        return self.__div__(other)
+        # other / self, where other is a python scalar
+        t = type(other)
+        if t is not float and t is not int:
+            other = _to_scalar(other)
+            if other is None:
+                return NotImplemented
+        value = Value(other / self.val)
+        if _GRAD_ENABLED:
+            value.children = (self,)
+            value.backward_func = (_rdiv_scalar_bwd, (other, self.val))
+        return value
     
     def backward(self):
         self.grad = 1.0
         # -- Get topological ordering with respect to self
-        topo = list(reversed(get_topological_order(self)))
-        for node in topo:
-            if isinstance(node, type(self)):
-                if node.backward_func is not None:
-                    grad = node.grad
-                    grads = node.backward_func(grad)
-                    for i, child in enumerate(node.children):
-                        if isinstance(child, type(self)):
-                            child.grad += grads[i]
-                else:
-                    continue
+        topo = get_topological_order(self)
+        for node in reversed(topo):
+            t = type(node)
+            if t is not Value and t is not Tensor:
+                continue
+            if node.backward_func is None:
+                continue
+            func, cache = node.backward_func
+            grads = func(node.grad, cache)
+            # -- Scatter the grads to the children. Nearly all nodes have one or two
+            #    children, so those cases are unpacked directly. Children that are
+            #    plain python numbers receive no gradient
+            children = node.children
+            n = len(children)
+            if n == 2:
+                c0, c1 = children
+                g0, g1 = grads
+                t = type(c0)
+                if t is Value or t is Tensor:
+                    c0.grad += g0
+                t = type(c1)
+                if t is Value or t is Tensor:
+                    c1.grad += g1
+            elif n == 1:
+                c0 = children[0]
+                t = type(c0)
+                if t is Value or t is Tensor:
+                    c0.grad += grads[0]
+            else:
+                for child, grad in zip(children, grads):
+                    t = type(child)
+                    if t is Value or t is Tensor:
+                        child.grad += grad
 
-        
 
+# -- Returns python scalars that are not exactly float or int (e.g. bool, np.float64)
+#    as a float, and None for any other type
+def _to_scalar(x):
+    if isinstance(x, (int, float)):
+        return float(x)
+    return None
 
 
-### Backward Function Objects
-class backward_add(object):
-    def __init__(self, cache=None):
-        self.cache = cache
+# -- Tensor object
+# -- Dense counterpart of Value holding a float64 np.ndarray. Used by Layer so that
+#    a whole layer is a single node of the computational graph instead of one
+#    Value per multiply and add.
+class Tensor(object):
+    '''
+    Tensor Object:
+        arguments:
+            - x: array-like input data
+        output:
+            - Tensor object with value = np.ndarray(x)
+    '''
+    __slots__ = ('children', 'backward_func', 'grad', 'requires_grad', 'val')
 
-    def __call__(self, grad):
-        return grad, grad
+    def __init__(self, x, children=None, requires_grad=False):
+        self.children = children if children is not None else ()
+        self.backward_func = None
+        self.val = np.asarray(x, dtype=np.float64)
+        # -- The gradient array is only created by the first accumulation in backward(),
+        #    so forward-only use and intermediate nodes do not allocate a zero buffer.
+        #    Layer parameters are instead bound to views of a flat gradient buffer
+        self.grad = 0.0
+        self.requires_grad = requires_grad
 
+    def value(self):
+        return self.val
 
-class backward_sub(object):
-    def __init__(self, cache=None):
-        self.cache = cache
+    def __repr__(self):
+        return "Tensor(data={})".format(self.val)
 
-    def __call__(self, grad):
-        return grad, -grad
-    
+    def __str__(self):
+        return "Tensor(data={})".format(self.val)
+
+    def __len__(self):
+        return len(self.val)
+
+    def __getitem__(self, i):
+        # Indexing returns a scalar Value that is still attached to the graph. For a batch
+        # (ndim > 1) it returns the row i as a Tensor, which is attached in the same way
+        if self.val.ndim > 1:
+            out = Tensor(self.val[i])
+            if _GRAD_ENABLED:
+                out.children = (self,)
+                out.backward_func = (_index_bwd, (i, self.val.shape))
+            return out
+        value = Value(float(self.val[i]))
+        if _GRAD_ENABLED:
+            value.children = (self,)
+            value.backward_func = (_index_bwd, (i, self.val.shape))
+        return value
 
-class backward_mul(object):
-    def __init__(self, cache=None):
-        self.cache = cache
+    def __neg__(self):
+        out = Tensor(-self.val)
+        if _GRAD_ENABLED:
+            out.children = (self,)
+            out.backward_func = (_neg_bwd, None)
+        return out
 
-    def __call__(self, grad):
-        return grad * self.cache[1], grad * self.cache[0]
-    
+    # -- Elementwise operations with a python scalar. The scalar backward functions
+    #    of Value work unchanged on arrays
+    def __add__(self, other):
+        t = type(other)
+        if t is not float and t is not int:
+            other = _to_scalar(other)
+            if other is None:
+                return NotImplemented
+        out = Tensor(self.val + other)
+        if _GRAD_ENABLED:
+            out.children = (self,)
+            out.backward_func = (_add_scalar_bwd, None)
+        return out
 
-class backward_div(object):
-    def __init__(self, cache=None):
-        self.cache = cache
+    def __radd__(self, other):
+    # Call __add__ to handle the reverse addition
+        return self.__add__(other)
 
-    def __call__(self, grad):
-        return grad / self.cache[1], - grad * self.cache[0] / (self.cache[1] * self.cache[1])
-    
+    def __sub__(self, other):
+        t = type(other)
+        if t is not float and t is not int:
+            other = _to_scalar(other)
+            if other is None:
+                return NotImplemented
+        out = Tensor(self.val - other)
+        if _GRAD_ENABLED:
+            out.children = (self,)
+            out.backward_func = (_add_scalar_bwd, None)
+        return out
 
-# In Backward_tanh, cache is the output of the forward pass
-class backward_tanh(object):
-    def __init__(self, cache=None):
-        self.cache = cache
+    def __rsub__(self, other):
+        # other - self, where other is a python scalar
+        t = type(other)
+        if t is not float and t is not int:
+            other = _to_scalar(other)
+            if other is None:
+                return NotImplemented
+        out = Tensor(other - self.val)
+        if _GRAD_ENABLED:
+            out.children = (self,)
+            out.backward_func = (_neg_bwd, None)
+        return out
 
-    def __call__(self, grad):
-        return [grad * (1 - self.cache * self.cache)]
+    def __mul__(self, other):
+        t = type(other)
+        if t is not float and t is not int:
+            other = _to_scalar(other)
+            if other is None:
+                return NotImplemented
+        out = Tensor(self.val * other)
+        if _GRAD_ENABLED:
+            out.children = (self,)
+            out.backward_func = (_mul_scalar_bwd, other)
+        return out
 
+    def __rmul__(self, other):
+    # Call __mul__ to handle the reverse multiplication
+        return self.__mul__(other)
+
+    def __truediv__(self, other):
+        t = type(other)
+        if t is not float and t is not int:
+            other = _to_scalar(other)
+            if other is None:
+                return NotImplemented
+        out = Tensor(self.val / other)
+        if _GRAD_ENABLED:
+            out.children = (self,)
+            out.backward_func = (_div_scalar_bwd, other)
+        return out
+
+    def __rtruediv__(self, other):
+        # other / self, where other is a python scalar
+        t = type(other)
+        if t is not float and t is not int:
+            other = _to_scalar(other)
+            if other is None:
+                return NotImplemented
+        out = Tensor(other / self.val)
+        if _GRAD_ENABLED:
+            out.children = (self,)
+            out.backward_func = (_rdiv_scalar_bwd, (other, self.val))
+        return out
+
+
+### Backward Functions
+# -- backward_func of a Value/Tensor is a (function, cache) tuple. The function is
+#    called as function(grad, cache) and returns one gradient per child
+def _add_bwd(grad, cache):
+    return grad, grad
+
+def _sub_bwd(grad, cache):
+    return grad, -grad
+
+def _neg_bwd(grad, cache):
+    return (-grad,)
+
+# -- Backward of an operation between a Value and a python scalar: only the Value
+#    is a child, so a single gradient is returned. The cache is the scalar
+def _add_scalar_bwd(grad, cache):
+    return (grad,)
+
+def _mul_scalar_bwd(grad, cache):
+    return (grad * cache,)
+
+def _div_scalar_bwd(grad, cache):
+    return (grad / cache,)
+
+# In _rdiv_scalar_bwd, cache is (scalar a, b) of the forward pass a / b
+def _rdiv_scalar_bwd(grad, cache):
+    a, b = cache
+    return (- grad * a / (b * b),)
+
+# In _mul_bwd and _div_bwd, cache is (a, b) of the forward pass
+def _mul_bwd(grad, cache):
+    a, b = cache
+    return grad * b, grad * a
+
+def _div_bwd(grad, cache):
+    a, b = cache
+    return grad / b, - grad * a / (b * b)
+
+# In _tanh_bwd, cache is the local derivative 1 - y * y of the forward output y
+def _tanh_bwd(grad, cache):
+    return (grad * cache,)
+
+# In _index_bwd, cache is (index, shape of the indexed Tensor)
+def _index_bwd(grad, cache):
+    out = np.zeros(cache[1])
+    out[cache[0]] = grad
+    return (out,)
+
+# In _stack_bwd, the grad of the stacked Tensor is split into one float per child
+def _stack_bwd(grad, cache):
+    return grad.tolist()
+
+# In _layer_bwd, cache is (input x, weights W, output a) of the forward pass
+# For a batch, x and a have a leading batch dimension and the W, b grads are summed over it
+def _layer_bwd(grad, cache):
+    x, W, a = cache
+    dz = grad * (1 - a * a)
+    if dz.ndim == 1:
+        return dz @ W, np.outer(dz, x), dz
+    return dz @ W, dz.T @ x, dz.sum(axis=0)
+
+# In _dot_add_tanh_bwd, cache is (1 - y * y, input values, weight values) of the forward
+# pass and the gradients are returned in the order of the children: x, w, b
+def _dot_add_tanh_bwd(grad, cache):
+    dy, x_vals, w_vals = cache
+    dz = grad * dy
+    return [dz * wv for wv in w_vals] + [dz * xv for xv in x_vals] + [dz]
+
+# In _ce_bwd, cache is the local derivative d(bce)/dq computed in the forward pass
+def _ce_bwd(grad, cache):
+    return (grad * cache,)
 
-class backward_CE(object):
-    def __init__(self, cache=None):
-        self.cache = cache
-        
-    def __call__(self, grad):
-        eps = 0.0001
-        return [ -0.5 * self.cache[0] / (self.cache[1] + eps) + 0.5 * (1 - self.cache[0]) / (1 - self.cache[1] + eps)]
-    
 
 def tanh(x):
     if not isinstance(x, Value):
         return tanh_func(x)
     else:
-        out = Value(tanh_func(x.val), [x])
-        out.backward_func = backward_tanh(out.val)
+        y = tanh_func(x.val)
+        out = Value(y)
+        if _GRAD_ENABLED:
+            out.children = (x,)
+            out.backward_func = (_tanh_bwd, 1.0 - y * y)
     return out
 
 def cross_entropy(p, q):
-    if not isinstance(p, Value):
-        out = Value(cross_entropy_func(p, q.val), [q])
-        out.backward_func = backward_CE([p, q.val])
-    else:
-        out = Value(cross_entropy_func(p.val, q.val), [q])
-        out.backward_func = backward_CE([p.val, q.val])
+    if isinstance(q, Tensor):
+        # -- Batch of predictions: a single node with the cross entropy summed over the
+        #    batch, so that gradients accumulate exactly as with one call per sample
+        p = np.asarray(p, dtype=np.float64).reshape(q.val.shape)
+        out = Value(float(cross_entropy_batch(p, q.val).sum()))
+        if _GRAD_ENABLED:
+            out.children = (q,)
+            out.backward_func = (_ce_bwd, cross_entropy_batch_bwd(p, q.val, 1.0))
+        return out
+    if isinstance(p, Value):
+        p = p.val
+    out = Value(cross_entropy_func(p, q.val))
+    if _GRAD_ENABLED:
+        out.children = (q,)
+        out.backward_func = (_ce_bwd, cross_entropy_grad(p, q.val))
+    return out
+
+# -- Stacks a sequence of Values (and python numbers) into a 1-D Tensor whose
+#    children are the elements, so that Values can be fed to a Layer
+def stack(values):
+    out = Tensor([xi.val if type(xi) is Value else float(xi) for xi in values])
+    if _GRAD_ENABLED:
+        out.children = tuple(values)
+        out.backward_func = (_stack_bwd, None)
+    return out
+
+# -- Fused tanh(x . w + b) used by Neuron: a single output node with the inputs,
+#    weights and bias as children, instead of one node per multiply and add
+def dot_add_tanh(x, w, b):
+    x_vals = [xi.val if type(xi) is Value else float(xi) for xi in x]
+    w_vals = [wi.val for wi in w]
+    # -- map(operator.mul) keeps the products in C, and starting the sum at the bias
+    #    skips the extra 0 + ... step
+    y = tanh_func(sum(map(operator.mul, x_vals, w_vals), b.val))
+    out = Value(y)
+    if _GRAD_ENABLED:
+        out.children = tuple(x) + tuple(w) + (b,)
+        out.backward_func = (_dot_add_tanh_bwd, (1.0 - y * y, x_vals, w_vals))
     return out
 
 def cross_entropy_func(p, q):
@@ -204,42 +505,64 @@ def cross_entropy_func(p, q):
 
     return bce
 
-## -- Topological ordering functionality
-def topo_order_recursive(root, topo, visited):
-    if root not in visited:
-        visited.add(root)
-        if isinstance(root, Value):
-            for node in root.children:
-                topo_order_recursive(node, topo, visited)
-        topo.append(root)
+# -- Derivative of cross_entropy_func with respect to q (log2 contributes the 1 / ln(2))
+def cross_entropy_grad(p, q):
+    eps = 0.0001
+    return (-0.5 * p / (q + eps) + 0.5 * (1 - p) / (1 - q + eps)) / math.log(2)
+
+# -- Vectorized counterparts of cross_entropy_func and cross_entropy_grad for arrays of (p, q) pairs
+def cross_entropy_batch(p, q, eps=0.0001):
+    p = np.asarray(p)
+    q = np.asarray(q)
+    return -0.5 * p * np.log2(q + eps) - 0.5 * (1 - p) * np.log2(1 - q + eps)
+
+def cross_entropy_batch_bwd(p, q, g, eps=0.0001):
+    p = np.asarray(p)
+    q = np.asarray(q)
+    return g * (-0.5 * p / (q + eps) + 0.5 * (1 - p) / (1 - q + eps)) / math.log(2)
 
+## -- Topological ordering functionality
+# -- Iterative DFS with an explicit stack: each node is pushed once to expand its
+#    children and once more (processed=True) to be appended after all of them
 def get_topological_order(root):
     visited = set()
     topo = []
-    topo_order_recursive(root, topo, visited)
+    stack = [(root, False)]
+    while stack:
+        node, processed = stack.pop()
+        if processed:
+            topo.append(node)
+            continue
+        if id(node) in visited:
+            continue
+        visited.add(id(node))
+        stack.append((node, True))
+        t = type(node)
+        if t is Value or t is Tensor:
+            for child in node.children:
+                # -- Children reached earlier through another path are not pushed again
+                if id(child) not in visited:
+                    stack.append((child, False))
+    # -- Children come before their parents. Callers that need the reverse order
+    #    iterate reversed(topo) rather than copying the list
     return topo
 
 
 
 def tanh_func(x):
-    ex = math.pow(math.e, x)
-    e_min_x = math.pow(math.e, -x)
-    return (ex - e_min_x) / (ex + e_min_x)
+    return math.tanh(x)
 
 
 class Neuron(object):
     def __init__(self, d_in):
         self.d_in = d_in
-        self.weights = [Value(random.uniform(-1, 1)) for i in range(self.d_in)]
+        self.weights = [Value(w) for w in np.random.uniform(-1, 1, self.d_in).tolist()]
         self.bias = Value(0.0)
-        self.params = [weight for weight in self.weights] + [self.bias]
+        self.params = self.weights + [self.bias]
 
     def __call__(self, x):
         assert len(x) == len(self.weights)
-        out = sum([x[i] * self.weights[i] for i in range(self.d_in)]) + self.bias
-        out = tanh(out)
-
-        return out
+        return dot_add_tanh(x, self.weights, self.bias)
     def zero_grad(self):
         for param in self.params:
             param.grad = 0.0
@@ -252,18 +575,40 @@ class Layer(object):
     def __init__(self, d_in, d_out):
         self.d_in = d_in
         self.d_out = d_out
-        self.neurons = [Neuron(d_in) for i in range(d_out)]
-        self.params = [param for neuron in self.neurons for param in neuron.params]
+        self.W = Tensor(np.random.uniform(-1, 1, (d_out, d_in)))
+        self.b = Tensor(np.zeros(d_out))
+        self.params = [self.W, self.b]
+        self._bind(np.concatenate([self.W.val.ravel(), self.b.val]), np.zeros(d_out * (d_in + 1)))
+    def _bind(self, param_vec, grad_vec):
+        # -- Make W and b (and their grads) views of the flat param_vec/grad_vec buffers
+        n = self.d_out * self.d_in
+        self.param_vec = param_vec
+        self.grad_vec = grad_vec
+        self.W.val = param_vec[:n].reshape(self.d_out, self.d_in)
+        self.W.grad = grad_vec[:n].reshape(self.d_out, self.d_in)
+        self.b.val = param_vec[n:]
+        self.b.grad = grad_vec[n:]
     def __call__(self, x):
-        assert len(x) == self.d_in
-        out = [neuron(x) for neuron in self.neurons]
+        # -- x is a single input of shape (d_in,) or a batch of shape (N, d_in)
+        #    A python sequence that contains Values is stacked so that gradients flow back to them.
+        #    ndarrays cannot hold Values, so they are wrapped without scanning their rows
+        if not isinstance(x, Tensor):
+            if isinstance(x, np.ndarray):
+                x = Tensor(x)
+            else:
+                x = stack(x) if any(type(xi) is Value for xi in x) else Tensor(x)
+        assert x.val.shape[-1] == self.d_in
+        a = np.tanh(x.val @ self.W.val.T + self.b.val)
+        out = Tensor(a)
+        if _GRAD_ENABLED:
+            out.children = (x, self.W, self.b)
+            out.backward_func = (_layer_bwd, (x.val, self.W.val, a))
 
         return out
     def zero_grad(self):
-        for param in self.params:
-            param.grad = 0.0
+        self.grad_vec.fill(0.0)
     def get_number_of_params(self):
-        return len(self.params)
+        return self.param_vec.size
 
 class MLP(object):
     def __init__(self, d_in, d_out, intermediate):
@@ -276,20 +621,26 @@ class MLP(object):
             self.layers.append(Layer(self.intermediate[i], self.intermediate[i+1]))
         self.layers.append(Layer(self.intermediate[-1], self.d_out))
         self.params = [param for layer in self.layers for param in layer.params]
+        # -- All layers share one contiguous parameter and gradient buffer
+        self.param_vec = np.concatenate([layer.param_vec for layer in self.layers])
+        self.grad_vec = np.zeros_like(self.param_vec)
+        offset = 0
+        for layer in self.layers:
+            n = layer.param_vec.size
+            layer._bind(self.param_vec[offset:offset + n], self.grad_vec[offset:offset + n])
+            offset += n
 
     def __call__(self, x):
         out = x
-        assert len(x) == self.d_in
         for layer in self.layers:
             out = layer(out)
 
         return out
     
     def zero_grad(self):
-        for param in self.params:
-            param.grad = 0.0
+        self.grad_vec.fill(0.0)
     def get_number_of_params(self):
-        return len(self.params)
+        return self.param_vec.size
 
 
 class BaseOptimizer(object):
@@ -298,20 +649,78 @@ class BaseOptimizer(object):
         self.lr = lr
         self.decay_type = decay_type
         self.weight_decay = weight_decay
+        # -- Set when params cover a contiguous range of a flat buffer (e.g. MLP.params), so that
+        #    step() and zero_grad() are single vectorized operations
+        self.param_vec, self.grad_vec = get_flat_buffers(params)
 
     def step(self):
+        if self.param_vec is not None:
+            p, g = self.param_vec, self.grad_vec
+            if self.weight_decay and self.decay_type == 2:
+                p -= self.lr * g + 2 * self.weight_decay * p
+            elif self.weight_decay:
+                p -= self.lr * g + self.weight_decay * np.sign(p)
+            else:
+                p -= self.lr * g
+            return
+
         for param in self.params:
             if self.weight_decay:
                 if self.decay_type == 2:
-                    param.val = param.val - self.lr * param.grad - self.weight_decay * (2 * param.val)
+                    update = self.lr * param.grad + self.weight_decay * (2 * param.val)
                 else:
-                    param.val = param.val - self.lr * param.grad 
-                    l1 = -1 if param.val > 0 else -1
-                    param.val -= self.weight_decay * l1
+                    update = self.lr * param.grad + self.weight_decay * ((param.val > 0) * 1.0 - (param.val < 0) * 1.0)
+            else:
+                update = self.lr * param.grad
+            if isinstance(param, Tensor):
+                # -- In place, so that views of a flat buffer stay attached to it
+                param.val -= update
             else:
-                param.val = param.val - self.lr * param.grad 
+                param.val = float(param.val - update)
 
     def zero_grad(self):
+        if self.grad_vec is not None:
+            self.grad_vec.fill(0.0)
+            return
+
         for param in self.params:
-            param.grad = 0.0
+            if isinstance(param.grad, np.ndarray):
+                param.grad.fill(0.0)
+            else:
+                param.grad = 0.0
 
+
+def get_flat_buffers(params):
+    '''
+    Returns (param_vec, grad_vec) views of the flat buffers that the given Tensor params
+    cover as one contiguous range (e.g. MLP.params, or the params of one of its layers),
+    or (None, None) if the params do not form such a range
+    '''
+    if len(params) == 0 or not all(isinstance(param, Tensor) and isinstance(param.grad, np.ndarray) for param in params):
+        return None, None
+    param_base, grad_base = params[0].val.base, params[0].grad.base
+    if param_base is None or grad_base is None or param_base.ndim != 1 or param_base.shape != grad_base.shape:
+        return None, None
+    ranges = []
+    for param in params:
+        if param.val.base is not param_base or param.grad.base is not grad_base:
+            return None, None
+        if not (param.val.flags.c_contiguous and param.grad.flags.c_contiguous):
+            return None, None
+        start = _buffer_offset(param.val, param_base)
+        if _buffer_offset(param.grad, grad_base) != start:
+            return None, None
+        ranges.append((start, start + param.val.size))
+    # -- The ranges must follow each other without gaps or overlaps
+    ranges.sort()
+    for (_, end), (start, _) in zip(ranges, ranges[1:]):
+        if start != end:
+            return None, None
+    start, end = ranges[0][0], ranges[-1][1]
+    if start == 0 and end == param_base.size:
+        return param_base, grad_base
+    return param_base[start:end], grad_base[start:end]
+
+def _buffer_offset(view, base):
+    # -- Element offset of a view from the start of its base buffer
+    return (view.__array_interface__['data'][0] - base.__array_interface__['data'][0]) // base.itemsize
@@ -0,0 +1,64 @@
+import jax
+import jax.numpy as jnp
+
+# -- JAX implementation of the MLP
+# -- The Value based MLP of dust.py builds the computational graph one python
+#    operation at a time. Here the forward pass is a pure function of the
+#    parameters, so that jax.jit(jax.grad(...)) compiles the whole forward and
+#    backward pass into a single XLA kernel with no python in the inner loop.
+#    Parameters are a list of (W, b) tuples with W of shape (d_in, d_out)
+
+def forward(params, x):
+    for W, b in params[:-1]:
+        x = jnp.tanh(x @ W + b)
+    W, b = params[-1]
+    return x @ W + b
+
+def mse_loss(params, x, y):
+    return jnp.mean(0.5 * (forward(params, x) - y) ** 2)
+
+grad_fn = jax.jit(jax.grad(mse_loss))
+
+@jax.jit
+def sgd_step(params, x, y, lr):
+    grads = grad_fn(params, x, y)
+    return jax.tree_util.tree_map(lambda param, grad: param - lr * grad, params, grads)
+
+
+class MLPJax(object):
+    '''
+    MLPJax Object:
+        arguments:
+            - d_in: input dimension
+            - d_out: output dimension
+            - intermediate: list of hidden layer dimensions
+            - seed: seed of the jax.random key used for the initialization
+        output:
+            - MLP with tanh hidden layers and a linear output layer
+    '''
+    def __init__(self, d_in, d_out, intermediate, seed=0):
+        self.d_in = d_in
+        self.d_out = d_out
+        self.depth = len(intermediate) + 2
+        self.intermediate = intermediate
+        dims = [d_in] + list(intermediate) + [d_out]
+        key = jax.random.PRNGKey(seed)
+        self.params = []
+        for i in range(len(dims) - 1):
+            key, subkey = jax.random.split(key)
+            W = jax.random.uniform(subkey, (dims[i], dims[i+1]), minval=-1.0, maxval=1.0)
+            b = jnp.zeros(dims[i+1])
+            self.params.append((W, b))
+
+    def __call__(self, x):
+        return forward(self.params, jnp.asarray(x))
+
+    def loss(self, x, y):
+        return mse_loss(self.params, jnp.asarray(x), jnp.asarray(y))
+
+    def step(self, x, y, lr=0.001):
+        # -- One compiled forward + backward + SGD update over the batch (x, y)
+        self.params = sgd_step(self.params, jnp.asarray(x), jnp.asarray(y), lr)
+
+    def get_number_of_params(self):
+        return sum(W.size + b.size for W, b in self.params)